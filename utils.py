@@ -1,46 +1,535 @@
 import psycopg2
+import psycopg2.pool
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+import orjson
 import pandas as pd
-import json
+import pyarrow as pa
+from pandas.api.types import (
+    is_bool_dtype,
+    is_datetime64_any_dtype,
+    is_float_dtype,
+    is_integer_dtype,
+    is_unsigned_integer_dtype,
+)
+import io
+import mmap
+import os
+import pathlib
+import re
+import contextlib
+import functools
+import threading
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+# Filas por bloque al leer resultados de un cursor
+_FETCH_SIZE = 10000
+
+# Pools de conexiones, uno por configuración de conexión
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+# Sentencias preparadas en cada conexión: {conexión: {nombre: query}}
+_PREPARED = weakref.WeakKeyDictionary()
+
+
+class _ConnectionPool(psycopg2.pool.ThreadedConnectionPool):
+    """
+    Pool de conexiones que mantiene abiertas las conexiones devueltas hasta
+    maxconn. psycopg2 cierra las conexiones que se devuelven cuando ya hay
+    minconn libres; aquí se abren bajo demanda y se conservan todas.
+    """
+
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        # minconn solo se usa al crear el pool y al devolver conexiones
+        self.minconn = maxconn
+
+    def discard_idle(self):
+        """
+        Cierra las conexiones libres del pool. Se usa cuando una conexión se
+        perdió (p. ej. el servidor se reinició), ya que las demás
+        probablemente también están muertas.
+        """
+        with self._lock:
+            for conn in self._pool:
+                conn.close()
+            self._pool.clear()
+
+
+def _get_pool(db_config, minconn=1, maxconn=16):
+    """
+    Retorna el pool de conexiones asociado a db_config, creándolo si no existe.
+
+    Parámetros:
+        db_config (dict): Diccionario con los datos de conexión.
+        minconn (int): Conexiones que el pool abre al crearse.
+        maxconn (int): Conexiones máximas del pool (todas se reutilizan).
+
+    Retorna:
+        _ConnectionPool: Pool de conexiones.
+    """
+    key = frozenset(db_config.items())
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None or pool.closed:
+            pool = _ConnectionPool(minconn, maxconn, **db_config)
+            _POOLS[key] = pool
+    return pool
+
+
+def close_pools():
+    """
+    Cierra todas las conexiones de los pools creados por este módulo.
+    """
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.closeall()
+        _POOLS.clear()
+
+
+# SQLSTATE de errores tras los que la conexión queda cerrada por el servidor
+# (reinicio, recuperación tras una caída, idle_session_timeout, etc.)
+_LOST_CONNECTION_CODES = ("57P01", "57P02", "57P03", "57P05")
+
+
+def _is_connection_lost(error):
+    """
+    Indica si un OperationalError se debe a que se perdió la conexión: errores
+    sin SQLSTATE (de libpq), de la clase 08 (connection exception) o de apagado
+    del servidor (57P0x). Otros errores del servidor, como un
+    statement_timeout, dejan la conexión usable.
+
+    Parámetros:
+        error (psycopg2.OperationalError): Error a revisar.
+
+    Retorna:
+        bool: True si la conexión ya no sirve.
+    """
+    pgcode = error.pgcode
+    return pgcode is None or pgcode.startswith("08") or pgcode in _LOST_CONNECTION_CODES
+
+
+@contextlib.contextmanager
+def _pooled_connection(db_config, readonly=False):
+    """
+    Presta una conexión del pool y la devuelve al terminar. Si la conexión se
+    pierde se descarta en lugar de volver al pool. Si el pool está agotado se
+    abre una conexión aparte que se cierra al terminar.
+
+    Parámetros:
+        db_config (dict): Diccionario con los datos de conexión.
+        readonly (bool): Si es True las transacciones de la conexión son de
+            solo lectura mientras esté prestada.
+
+    Retorna:
+        psycopg2.extensions.connection: Conexión lista para usarse.
+    """
+    pool = _get_pool(db_config)
+    try:
+        conn = pool.getconn()
+    except psycopg2.pool.PoolError:
+        # Pool agotado: se usa una conexión aparte que se cierra al terminar
+        pool = None
+        conn = psycopg2.connect(**db_config)
+    broken = False
+    try:
+        if readonly:
+            conn.readonly = True
+        yield conn
+    except psycopg2.OperationalError as e:
+        broken = _is_connection_lost(e)
+        raise
+    finally:
+        broken = broken or bool(conn.closed)
+        if not broken and readonly:
+            conn.rollback()
+            conn.readonly = None
+        # Devolver la conexión al pool
+        if pool is None:
+            conn.close()
+        else:
+            pool.putconn(conn, close=broken)
+            # Si esta conexión se perdió, las libres del pool también
+            # pueden estarlo: se cierran para que se abran conexiones nuevas
+            if broken:
+                pool.discard_idle()
+
+
+def _to_arrow_array(values):
+    """
+    Convierte los valores de una columna en un arreglo de Arrow.
+
+    Parámetros:
+        values (sequence): Valores de la columna.
+
+    Retorna:
+        pa.Array: Arreglo de Arrow, o None si Arrow no puede inferir un tipo
+            (p. ej. Decimal('NaN') o json que mezcla objetos y escalares).
+    """
+    try:
+        array = pa.array(values)
+    except (pa.ArrowException, OverflowError):
+        return None
+    # Fechas con zona horaria en UTC, para que todos los bloques tengan el
+    # mismo tipo aunque empiecen con distinto desfase (p. ej. por horario de
+    # verano)
+    if pa.types.is_timestamp(array.type) and array.type.tz is not None:
+        array = array.cast(pa.timestamp(array.type.unit, tz="UTC"))
+    return array
+
+
+def _rows_to_arrow(rows, ncols):
+    """
+    Convierte las filas de un cursor en columnas de Arrow.
+
+    Parámetros:
+        rows (list): Tuplas retornadas por el cursor.
+        ncols (int): Número de columnas.
+
+    Retorna:
+        list: Por columna, un pa.Array o, si Arrow no pudo convertirla, la
+            lista de valores de Python.
+    """
+    cols_data = list(zip(*rows)) if rows else [() for _ in range(ncols)]
+    arrays = []
+    for values in cols_data:
+        array = _to_arrow_array(values)
+        arrays.append(list(values) if array is None else array)
+    return arrays
+
+
+def _merge_arrow_column(parts):
+    """
+    Une los bloques de una columna en una Serie.
+
+    Parámetros:
+        parts (list): Bloques de la columna retornados por _rows_to_arrow.
+
+    Retorna:
+        pd.Series: Columna con tipo de Arrow (pd.ArrowDtype) si todos los
+            bloques se pueden unificar; si no, columna object.
+    """
+    if all(isinstance(part, pa.Array) for part in parts):
+        try:
+            # Se promueven los tipos a uno común (p. ej. decimal128 con
+            # distinta precisión)
+            tables = [pa.table({"valores": part}) for part in parts]
+            merged = pa.concat_tables(tables, promote_options="permissive")
+            return pd.Series(pd.arrays.ArrowExtensionArray(merged["valores"]))
+        except pa.ArrowException:
+            pass
+
+    values = []
+    for part in parts:
+        values.extend(part.to_pylist() if isinstance(part, pa.Array) else part)
+    return pd.Series(values, dtype=object)
+
+
+def _arrow_blocks_to_frame(blocks, columns):
+    """
+    Construye un DataFrame con tipos de Arrow a partir de bloques de columnas.
+
+    Parámetros:
+        blocks (list): Bloques retornados por _rows_to_arrow.
+        columns (list): Nombres de las columnas.
+
+    Retorna:
+        pd.DataFrame: Filas de todos los bloques.
+    """
+    data = {
+        i: _merge_arrow_column([block[i] for block in blocks])
+        for i in range(len(columns))
+    }
+    df = pd.DataFrame(data, copy=False)
+    df.columns = columns  # Admite nombres de columna repetidos
+    return df
+
+
+def _rows_to_frame(rows, columns, dtype_backend=None):
+    """
+    Convierte las filas de un cursor en un DataFrame.
+
+    Parámetros:
+        rows (list): Tuplas retornadas por el cursor.
+        columns (list): Nombres de las columnas.
+        dtype_backend (str, opcional): "pyarrow" para construir las columnas
+            directamente como arreglos de Arrow (pd.ArrowDtype).
+
+    Retorna:
+        pd.DataFrame: Filas en forma de DataFrame.
+    """
+    if dtype_backend == "pyarrow":
+        return _arrow_blocks_to_frame([_rows_to_arrow(rows, len(columns))], columns)
+    return pd.DataFrame(rows, columns=columns)
+
+
+def _iter_cursor_blocks(cursor, chunksize):
+    """
+    Genera por bloques las filas de un cursor en el que ya se ejecutó un query.
+
+    Parámetros:
+        cursor: Cursor de psycopg2 con el query ejecutado.
+        chunksize (int): Filas por bloque.
+
+    Retorna:
+        generator: Tuplas (columnas, filas) con hasta chunksize filas cada una.
+            El primer bloque se genera siempre, aunque esté vacío.
+    """
+    rows = cursor.fetchmany(chunksize)
+    columns = [
+        desc[0] for desc in cursor.description
+    ]  # Obtener nombres de columnas
+
+    yield columns, rows
+    while rows:
+        rows = cursor.fetchmany(chunksize)
+        if rows:
+            yield columns, rows
+
+
+def _iter_query_chunks(query, db_config, chunksize, dtype_backend=None):
+    """
+    Ejecuta un query con un cursor del lado del servidor y genera los
+    resultados como DataFrames de hasta chunksize filas, sin traer todo el
+    resultado de una sola vez. Los tipos de cada DataFrame se infieren con las
+    filas de su bloque. El query debe ser un SELECT o VALUES.
+
+    Parámetros:
+        query (str): Consulta SQL.
+        db_config (dict): Diccionario con los datos de conexión.
+        chunksize (int): Filas por bloque.
+        dtype_backend (str, opcional): Ver _rows_to_frame.
+
+    Retorna:
+        generator: DataFrames con hasta chunksize filas cada uno.
+    """
+    # Obtener una conexión del pool (solo lectura)
+    with _pooled_connection(db_config, readonly=True) as conn:
+        # Cursor con nombre: las filas se quedan en el servidor hasta pedirlas
+        with conn.cursor(name="stream_" + uuid.uuid4().hex) as cursor:
+            cursor.itersize = chunksize
+
+            # Ejecutar el query
+            cursor.execute(query)
+            for columns, rows in _iter_cursor_blocks(cursor, chunksize):
+                yield _rows_to_frame(rows, columns, dtype_backend)
+
 
+def _fetch_query(query, db_config, dtype_backend=None):
+    """
+    Ejecuta un query y construye un solo DataFrame con todas las filas, para
+    que los tipos se infieran con el resultado completo. Usa un cursor normal,
+    así que acepta cualquier sentencia que retorne filas (EXPLAIN, SHOW, varias
+    sentencias separadas por ";", etc.).
 
-def execute_query(query, db_config):
+    Parámetros:
+        query (str): Consulta SQL.
+        db_config (dict): Diccionario con los datos de conexión.
+        dtype_backend (str, opcional): Ver _rows_to_frame.
+
+    Retorna:
+        pd.DataFrame: Resultados de la consulta.
+    """
+    # Obtener una conexión del pool (solo lectura)
+    with _pooled_connection(db_config, readonly=True) as conn:
+        with conn.cursor() as cursor:
+            # Ejecutar el query
+            cursor.execute(query)
+            blocks = _iter_cursor_blocks(cursor, _FETCH_SIZE)
+
+            if dtype_backend == "pyarrow":
+                # Cada bloque pasa a Arrow apenas se lee
+                arrow_blocks = []
+                for columns, rows in blocks:
+                    arrow_blocks.append(_rows_to_arrow(rows, len(columns)))
+                return _arrow_blocks_to_frame(arrow_blocks, columns)
+
+            data = []
+            for columns, rows in blocks:
+                data.extend(rows)
+    return _rows_to_frame(data, columns, dtype_backend)
+
+
+def _downcast_dtypes(df):
+    """
+    Reduce la memoria de un DataFrame usando los tipos numéricos más pequeños
+    posibles y convirtiendo a category las columnas de texto con pocos valores
+    distintos.
+
+    Parámetros:
+        df (pd.DataFrame): DataFrame a reducir (se modifica en el lugar).
+
+    Retorna:
+        pd.DataFrame: El mismo DataFrame con los tipos reducidos.
+    """
+    for col in df.columns:
+        serie = df[col]
+        if pd.api.types.is_integer_dtype(serie):
+            downcast = "unsigned" if (serie >= 0).all() else "integer"
+            df[col] = pd.to_numeric(serie, downcast=downcast)
+        elif pd.api.types.is_float_dtype(serie):
+            df[col] = pd.to_numeric(serie, downcast="float")
+        elif serie.dtype == "object" and len(serie) > 0:
+            # Solo texto: listas (ARRAY) o dicts (json) no se pueden agrupar
+            if pd.api.types.infer_dtype(serie, skipna=True) != "string":
+                continue
+            if serie.nunique() / len(serie) < 0.5:
+                df[col] = serie.astype("category")
+    return df
+
+
+def execute_query(
+    query, db_config, chunksize=None, need_downcast=False, dtype_backend=None
+):
     """
     Ejecuta un query SQL en PostgreSQL y retorna los resultados en un DataFrame.
 
     Parámetros:
         query (str): Consulta SQL.
         db_config (dict): Diccionario con los datos de conexión (host, dbname, user, password, port).
+        chunksize (int, opcional): Si se indica, retorna un generador de
+            DataFrames con hasta chunksize filas cada uno en lugar de un solo
+            DataFrame. La conexión se mantiene ocupada hasta agotar el generador.
+            En este modo el query debe ser un SELECT o VALUES.
+            Los tipos de cada DataFrame se infieren solo con sus filas, y los
+            errores de psycopg2 se lanzan al recorrer el generador (no se
+            imprimen ni se reintenta la consulta).
+        need_downcast (bool): Si es True reduce los tipos de datos del resultado
+            para ocupar menos memoria (enteros y flotantes más pequeños, texto
+            repetido como category). No se puede usar junto con chunksize.
+        dtype_backend (str, opcional): Si es "pyarrow" las columnas del
+            resultado usan tipos de Arrow (pd.ArrowDtype), que ocupan menos
+            memoria en columnas de texto. Las fechas con zona horaria quedan
+            en UTC, y las columnas que Arrow no puede representar quedan como
+            object. Cualquier otro valor distinto de None lanza ValueError.
 
     Retorna:
         pd.DataFrame: Resultados de la consulta.
     """
+    if dtype_backend not in (None, "pyarrow"):
+        raise ValueError(
+            f"dtype_backend debe ser None o 'pyarrow', no {dtype_backend!r}."
+        )
+
+    if chunksize is not None:
+        # Reducir cada bloque por separado daría tipos distintos entre bloques
+        if need_downcast:
+            raise ValueError("need_downcast no se puede usar junto con chunksize.")
+        return _iter_query_chunks(query, db_config, chunksize, dtype_backend)
+
     try:
-        # Conectar a PostgreSQL
-        conn = psycopg2.connect(**db_config)
-        cursor = conn.cursor()
+        # Leer por bloques y construir un solo DataFrame; si la conexión se
+        # perdió se reintenta una vez (el pool ya descartó sus conexiones
+        # libres, así que el reintento usa una conexión nueva)
+        try:
+            df = _fetch_query(query, db_config, dtype_backend)
+        except psycopg2.OperationalError as e:
+            if not _is_connection_lost(e):
+                raise
+            df = _fetch_query(query, db_config, dtype_backend)
+
+        # Reducir tipos de datos
+        if need_downcast:
+            df = _downcast_dtypes(df)
 
-        # Ejecutar el query
-        cursor.execute(query)
-        columns = [
-            desc[0] for desc in cursor.description
-        ]  # Obtener nombres de columnas
-        data = cursor.fetchall()
+        return df
+    except psycopg2.Error as e:
+        print(f"Error ejecutando la consulta: {e}")
+        return None
 
-        # Convertir a DataFrame
-        df = pd.DataFrame(data, columns=columns)
 
-        # Cerrar conexión
-        cursor.close()
-        conn.close()
+def execute_prepared(name, query, params, db_config):
+    """
+    Ejecuta una consulta como sentencia preparada en el servidor. La primera
+    vez que se usa en una conexión del pool se hace PREPARE; las siguientes
+    solo EXECUTE, evitando que PostgreSQL vuelva a analizar y planificar la
+    consulta.
+
+    Parámetros:
+        name (str): Nombre de la sentencia preparada.
+        query (str): Consulta SQL con parámetros posicionales ($1, $2, ...).
+        params (tuple): Valores de los parámetros.
+        db_config (dict): Diccionario con los datos de conexión.
+
+    Retorna:
+        pd.DataFrame: Resultados de la consulta (None si no retorna filas).
+    """
+    try:
+        with _pooled_connection(db_config) as conn:
+            with conn.cursor() as cursor:
+                # Preparar la sentencia si esta conexión aún no la conoce
+                prepared = _PREPARED.setdefault(conn, {})
+                if prepared.get(name) != query:
+                    if name in prepared:
+                        cursor.execute(
+                            sql.SQL("DEALLOCATE {}").format(sql.Identifier(name))
+                        )
+                        del prepared[name]
+                    cursor.execute(
+                        sql.SQL("PREPARE {} AS ").format(sql.Identifier(name))
+                        + sql.SQL(query)
+                    )
+                    prepared[name] = query
+
+                # Ejecutar la sentencia preparada
+                execute_stmt = sql.SQL("EXECUTE {}").format(sql.Identifier(name))
+                if params:
+                    placeholders = sql.SQL(", ").join(sql.Placeholder() * len(params))
+                    execute_stmt += sql.SQL(" ({})").format(placeholders)
+                cursor.execute(execute_stmt, params or None)
+
+                df = None
+                if cursor.description is not None:
+                    columns = [
+                        desc[0] for desc in cursor.description
+                    ]  # Obtener nombres de columnas
+                    df = pd.DataFrame(cursor.fetchall(), columns=columns)
+            conn.commit()
 
         return df
-    except Exception as e:
-        print(f"Error ejecutando la consulta: {e}")
+    except psycopg2.Error as e:
+        print(f"Error ejecutando la sentencia preparada: {e}")
         return None
 
 
+def _postgres_type(dtype):
+    """
+    Retorna el tipo de PostgreSQL equivalente a un dtype de pandas.
+
+    Parámetros:
+        dtype: Tipo de datos de una columna del DataFrame.
+
+    Retorna:
+        str: Tipo de columna en PostgreSQL.
+    """
+    if is_bool_dtype(dtype):
+        return "BOOLEAN"
+    if is_integer_dtype(dtype):
+        # uint64 no cabe en BIGINT
+        if is_unsigned_integer_dtype(dtype) and dtype.itemsize == 8:
+            return "NUMERIC"
+        return "BIGINT"
+    if is_float_dtype(dtype):
+        return "DOUBLE PRECISION"
+    if isinstance(dtype, pd.ArrowDtype) and pa.types.is_date(dtype.pyarrow_dtype):
+        return "DATE"
+    if is_datetime64_any_dtype(dtype):
+        # En columnas de Arrow la zona horaria está en el tipo de pyarrow
+        if isinstance(dtype, pd.ArrowDtype):
+            tz = getattr(dtype.pyarrow_dtype, "tz", None)
+        else:
+            tz = getattr(dtype, "tz", None)
+        if tz is not None:
+            return "TIMESTAMPTZ"
+        return "TIMESTAMP"
+    return "TEXT"
+
+
 # Función para crear una tabla en PostgreSQL a partir de un DataFrame
-def create_table_from_df(df, table_name, db_config):
+def create_table_from_df(df, table_name, db_config, use_copy=True, page_size=5000):
     """
     Crea una tabla en PostgreSQL basada en un DataFrame.
 
@@ -48,51 +537,78 @@ def create_table_from_df(df, table_name, db_config):
         df (pd.DataFrame): DataFrame con los datos.
         table_name (str): Nombre de la tabla a crear.
         db_config (dict): Diccionario con los datos de conexión.
+        use_copy (bool): Si es True carga los datos con COPY; si es False usa
+            INSERT de varias filas (execute_values).
+        page_size (int): Filas por sentencia INSERT cuando use_copy es False.
 
     Retorna:
         None
     """
     try:
-        # Conectar a PostgreSQL
-        conn = psycopg2.connect(**db_config)
-        cursor = conn.cursor()
-
         # Construir el esquema de la tabla
         column_types = []
         for column, dtype in df.dtypes.items():
-            if "int" in str(dtype):
-                column_type = "INTEGER"
-            elif "float" in str(dtype):
-                column_type = "FLOAT"
-            else:
-                column_type = "TEXT"
-            column_types.append(f'"{column}" {column_type}')
+            column_types.append(f'"{column}" {_postgres_type(dtype)}')
 
         columns_schema = ", ".join(column_types)
         create_table_query = (
             f'CREATE TABLE IF NOT EXISTS "{table_name}" ({columns_schema});'
         )
 
-        # Crear la tabla
-        cursor.execute(create_table_query)
-        conn.commit()
+        # Obtener una conexión del pool
+        with _pooled_connection(db_config) as conn:
+            with conn.cursor() as cursor:
+                # Todo se hace en una sola transacción, sin esperar el fsync
+                # del commit
+                cursor.execute("SET LOCAL synchronous_commit = off")
+
+                # Crear la tabla
+                cursor.execute(create_table_query)
+
+                # Insertar datos
+                if use_copy:
+                    # COPY: una sola ida y vuelta al servidor
+                    buffer = io.StringIO()
+                    df.to_csv(buffer, index=False, header=False, na_rep="\\N")
+                    buffer.seek(0)
+                    copy_query = (
+                        f'COPY "{table_name}" FROM STDIN WITH (FORMAT CSV, NULL \'\\N\')'
+                    )
+                    cursor.copy_expert(copy_query, buffer)
+                else:
+                    # INSERT de varias filas por sentencia
+                    # (itertuples entrega tuplas simples, sin crear una Serie por fila)
+                    rows = df.itertuples(index=False, name=None)
+                    insert_query = f'INSERT INTO "{table_name}" VALUES %s'
+                    template = "(" + ", ".join(["%s"] * len(df.columns)) + ")"
+                    execute_values(
+                        cursor,
+                        insert_query,
+                        rows,
+                        template=template,
+                        page_size=page_size,
+                    )
+
+                # hacer que se borre en caso de que exista y se cree una nueva.
+
+                conn.commit()
 
-        # Insertar datos
-        for _, row in df.iterrows():
-            values = ", ".join(["%s"] * len(row))
-            insert_query = f'INSERT INTO "{table_name}" VALUES ({values})'
-            cursor.execute(insert_query, tuple(row))
+        print(f"Tabla '{table_name}' creada exitosamente en PostgreSQL.")
+    except psycopg2.Error as e:
+        print(f"Error al crear la tabla: {e}")
 
-            # hacer que se borre en caso de que exista y se cree una nueva.
 
-        conn.commit()
+# Tamaño (bytes) a partir del cual los JSON se leen con mmap
+_MMAP_MIN_SIZE = 10 * 1024 * 1024
 
-        # Cerrar conexión
-        cursor.close()
-        conn.close()
-        print(f"Tabla '{table_name}' creada exitosamente en PostgreSQL.")
-    except Exception as e:
-        print(f"Error al crear la tabla: {e}")
+
+@functools.lru_cache(maxsize=128)
+def _read_sql_cached(file_path, mtime_ns):
+    """
+    Lee un archivo .sql; los resultados se guardan por (ruta, fecha de
+    modificación).
+    """
+    return pathlib.Path(file_path).read_text(encoding="utf-8")
 
 
 def read_sql_file(file_path):
@@ -106,10 +622,12 @@ def read_sql_file(file_path):
         str: Contenido del archivo .sql
     """
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            sql_query = file.read()
+        # La fecha de modificación forma parte de la llave del caché, así un
+        # archivo editado se vuelve a leer
+        file_path = os.fspath(file_path)
+        sql_query = _read_sql_cached(file_path, os.stat(file_path).st_mtime_ns)
         return sql_query
-    except Exception as e:
+    except (OSError, UnicodeDecodeError) as e:
         print(f"Error al leer el archivo: {e}")
         return None
 
@@ -125,15 +643,54 @@ def read_json_file(file_path):
         dict: Contenido del archivo en formato de diccionario
     """
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            data = json.load(file)
+        with open(file_path, "rb") as file:
+            if os.fstat(file.fileno()).st_size > _MMAP_MIN_SIZE:
+                # Archivos grandes: parsear directamente desde memoria mapeada
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    with memoryview(mm) as contenido:
+                        data = orjson.loads(contenido)
+            else:
+                data = orjson.loads(file.read())
         return data
-    except Exception as e:
+    except (OSError, orjson.JSONDecodeError) as e:
         print(f"Error al leer el archivo JSON: {e}")
         return None
 
 
-def limpieza_general(df):
+def read_many_files(file_paths, max_workers=8):
+    """
+    Lee varios archivos de texto (por ejemplo .sql o .json) en paralelo y
+    retorna sus contenidos en el mismo orden.
+
+    Parámetros:
+        file_paths (list): Rutas de los archivos.
+        max_workers (int): Lecturas simultáneas como máximo.
+
+    Retorna:
+        list: Contenido de cada archivo como string.
+    """
+    try:
+        paths = [pathlib.Path(file_path) for file_path in file_paths]
+
+        # Con pocos archivos no vale la pena crear hilos
+        if len(paths) <= 8:
+            return [path.read_text(encoding="utf-8") for path in paths]
+
+        # La lectura de archivos libera el GIL, así que los hilos se solapan
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(
+                executor.map(lambda path: path.read_text(encoding="utf-8"), paths)
+            )
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Error al leer los archivos: {e}")
+        return None
+
+
+# Caracteres no válidos en nombres de columnas (incluye espacios)
+_NO_ALFANUMERICO = re.compile(r"[^\w]")
+
+
+def limpieza_general(df, subset=None):
     """
     Realiza una limpieza general de un DataFrame:
     - Normaliza nombres de columnas.
@@ -142,34 +699,64 @@ def limpieza_general(df):
     - Elimina duplicados.
     - Reporta tipos de datos y nulos.
 
+    Parámetros:
+    - subset (list, opcional): Columnas (ya normalizadas) que identifican una
+      fila para eliminar duplicados. Por defecto se usan todas.
+
     Retorna:
     - df_limpio: DataFrame limpio.
     """
-    df = df.copy()  # Evitar modificar el original
+    # Copia superficial: las columnas se reemplazan (no se modifican en el
+    # lugar), así que el DataFrame original no cambia y no se duplican datos
+    df = df.copy(deep=False)
 
     # 1. Nombres de columnas estandarizados
-    df.columns = (
-        df.columns.str.strip()
-        .str.lower()
-        .str.replace(" ", "_")
-        .str.replace(r"[^\w]", "_", regex=True)
-    )
+    df.columns = [
+        _NO_ALFANUMERICO.sub("_", str(col).strip().lower()) for col in df.columns
+    ]
 
     # 2. Limpiar espacios en columnas tipo texto
-    for col in df.select_dtypes(include="object").columns:
-        df[col] = df[col].str.strip()
+    # (como strings de Arrow, el strip corre en C++ y no objeto por objeto).
+    # Solo columnas con texto: Decimals, bools, listas o dicts no se tocan.
+    text_cols = [
+        col
+        for col in df.select_dtypes(include="object").columns
+        if pd.api.types.infer_dtype(df[col], skipna=True) == "string"
+    ]
+    if text_cols:
+        df[text_cols] = (
+            df[text_cols].astype("string[pyarrow]").apply(lambda s: s.str.strip())
+        )
 
     # 3. Intentar convertir columnas que parecen fechas
-    for col in df.columns:
-        if df[col].dtype == "object":
-            try:
-                df[col] = pd.to_datetime(df[col], errors="raise")
-                print(f"📅 Columna '{col}' convertida a fecha.")
-            except:
-                continue
+    # (se prueba primero con una muestra; la columna completa solo se convierte
+    # si casi todos sus valores son fechas ISO 8601)
+    for col in text_cols:
+        muestra = df[col].dropna().head(100)
+        if muestra.empty:
+            continue
+        fechas = pd.to_datetime(muestra, errors="coerce", format="ISO8601")
+        if fechas.notna().mean() <= 0.95:
+            continue
+
+        fechas = pd.to_datetime(df[col], errors="coerce", format="ISO8601", cache=True)
+        no_nulos = df[col].notna().sum()
+        perdidos = no_nulos - fechas.notna().sum()
+        if perdidos > 0.05 * no_nulos:
+            # Demasiados valores no son fechas: se deja la columna como texto
+            print(
+                f"⚠️ Columna '{col}' no convertida a fecha: "
+                f"{perdidos} de {no_nulos} valores no son fechas."
+            )
+            continue
+
+        df[col] = fechas
+        print(f"📅 Columna '{col}' convertida a fecha.")
+        if perdidos:
+            print(f"   {perdidos} valores no válidos quedaron como NaT.")
 
     # 4. Eliminar duplicados
-    df = df.drop_duplicates()
+    df = df.drop_duplicates(subset=subset)
 
     # 5. Reporte de tipos y nulos
     print("\n📊 Tipos de datos:")